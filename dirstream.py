@@ -0,0 +1,69 @@
+import os
+
+
+def is_encrypted_metadata(path=''):
+    return path.endswith('.private') or path.endswith('.public')
+
+
+class DirStream:
+    def __init__(self, path, hidden=()):
+        self._path = path
+        self._hidden = hidden
+        self._scandir = os.scandir(path)
+        self._dirents = self._scan()
+        self._pending = None
+        self.offset = 0
+
+    # ------------------------------------------------------ Helpers
+
+    def _rewind(self):
+        self._scandir.close()
+        self._scandir = os.scandir(self._path)
+        self._dirents = self._scan()
+        self._pending = None
+        self.offset = 0
+
+    def _seek(self, offset):
+        # Offset dell'ultima entry accettata dal kernel
+        accepted = self.offset - 1 if self._pending is not None else self.offset
+        if offset == accepted:
+            return
+
+        # rewinddir/seekdir: si riparte da capo e si saltano le entry già lette
+        self._rewind()
+        while self.offset < offset and next(self._dirents, None) is not None:
+            self.offset += 1
+
+    def _scan(self):
+        yield '.', None
+        yield '..', None
+
+        for entry in self._scandir:
+            if not is_encrypted_metadata(entry.name) and entry.name not in self._hidden:
+                yield entry.name, entry
+
+    # ------------------------------------------------------ Methods
+
+    def entries(self, attrs_of, offset=None):
+        # Restituisce (nome, attributi, offset) a partire dalla entry successiva a offset
+        # (se None, dall'ultimo offset accettato). Se il buffer del kernel si riempie,
+        # la entry rifiutata resta in sospeso e viene riproposta alla chiamata successiva.
+        if offset is not None:
+            self._seek(offset)
+
+        while True:
+            if self._pending is None:
+                dirent = next(self._dirents, None)
+                if dirent is None:
+                    return
+
+                name, entry = dirent
+                self.offset += 1
+                attrs = attrs_of(entry) if entry is not None else None
+                self._pending = (name, attrs, self.offset)
+
+            yield self._pending
+            self._pending = None
+
+    def close(self):
+        self._scandir.close()
@@ -1,11 +1,18 @@
 import json
 import os
-from aesmix import MixSlice
+from mixsliceloader import decrypt
 
 
 def size_decrypt(path, public_metadata):
-    reader = MixSlice.load_from_file(path, public_metadata)
-    return len(reader.decrypt())
+    return len(decrypt(path, public_metadata))
+
+
+def size_from_finfo(file_finfo):
+    try:
+        with open(file_finfo) as f:
+            return json.load(f).get('size')
+    except (OSError, ValueError):
+        return None
 
 
 class EncFilesInfo():
@@ -14,18 +21,30 @@ class EncFilesInfo():
         self._public_metadata = public_metadata
         self._file_finfo = file_finfo
         
-        self._size = size_decrypt(path, public_metadata)
-        self._update_finfo()
+        self._size = None
+        self._dirty = False
+        self._load_size()
 
     # ------------------------------------------------------ Helpers
 
-    def _update_finfo(self):
+    def _load_size(self):
+        # La dimensione salvata nel .finfo evita di decifrare tutto il file
+        self._size = size_from_finfo(self._file_finfo)
+        if self._size is None:
+            self._size = size_decrypt(self._path, self._public_metadata)
+            self._update_finfo(self._size)
+
+    def _update_finfo(self, size):
+        # Con size None la dimensione viene tolta dal .finfo
         finfo = {}
         if os.path.isfile(self._file_finfo):
             with open(self._file_finfo) as f:
                 finfo = json.load(f)
         
-        finfo['size'] = self._size
+        if size is None:
+            finfo.pop('size', None)
+        else:
+            finfo['size'] = size
 
         with open(self._file_finfo, 'w') as f:
             json.dump(finfo, f)
@@ -38,14 +57,21 @@ class EncFilesInfo():
         self._file_finfo = file_finfo
 
         self._size = None
+        self._dirty = False
+
+    def save(self):
+        # Da chiamare dopo aver salvato i frammenti cifrati
+        if not self._dirty:
+            return
+        self._dirty = False
+        self._update_finfo(self._size)
 
     # ------------------------------------------------------ Size
 
     @property
     def size(self):
         if self._size is None:
-            self._size = size_decrypt(self._path, self._public_metadata)
-            self._update_finfo()
+            self._load_size()
         return self._size
 
     @size.setter
@@ -53,4 +79,9 @@ class EncFilesInfo():
         if self._size == value:
             return
         self._size = value
-        self._update_finfo()
+
+        # Finché i frammenti non vengono salvati il .finfo non ha una dimensione valida:
+        # se il processo muore prima del flush, al mount successivo si decifra di nuovo
+        if not self._dirty:
+            self._dirty = True
+            self._update_finfo(None)
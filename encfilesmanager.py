@@ -4,6 +4,7 @@ import threading
 from aesmix import MixSlice
 from time import time
 from filebytecontent import FileByteContent
+from mixsliceloader import decrypt
 
 LOCK = threading.Lock()
 
@@ -28,8 +29,7 @@ class EncFilesManager():
 
     def _decrypt(self, path):
         public_metafiles = self.public_metafiles[path]
-        reader = MixSlice.load_from_file(path, public_metafiles)
-        return reader.decrypt()
+        return decrypt(path, public_metafiles)
 
     def _encrypt(self, path):
         plaintext = self.open_files[path].read_all()
@@ -63,7 +63,7 @@ class EncFilesManager():
                 self.public_metafiles[path] = public_metafile_path
                 self.private_metafiles[path] = private_metafile_path
                 
-                self.open_files[path] = FileByteContent(b'')
+                self.open_files[path] = FileByteContent(bytearray())
                 self.open_counters[path] = 1
                 
                 self.atimes[path] = int(time())
@@ -2,7 +2,9 @@ import threading
 
 class FileByteContent:
     def __init__(self, text):
-        self._text = text
+        # text è un buffer scrivibile (bytearray o memoryview): le letture
+        # restituiscono memoryview senza copiare, le scritture creano un nuovo buffer
+        self._text = memoryview(text)
         self._cond = threading.Condition(threading.Lock())
         self._readers = 0
 
@@ -37,8 +39,10 @@ class FileByteContent:
         return length
 
     def read_all(self):
+        # Copia mutabile: Padder.pad (in MixSlice.encrypt) la estende in place,
+        # quindi la cifratura non fa altre copie oltre a questa
         self._r_acquire()
-        text = self._text
+        text = bytearray(self._text)
         self._r_release()
         return text
 
@@ -51,12 +55,16 @@ class FileByteContent:
     def write_bytes(self, buf, offset):
         self._w_acquire()
         bytes_written = len(buf)
-        new_text = self._text[:offset] + buf + self._text[offset+bytes_written:]
-        self._text = new_text
+        new_text = bytearray(self._text[:offset])
+        new_text += buf
+        new_text += self._text[offset+bytes_written:]
+        self._text = memoryview(new_text)
         self._w_release()
         return bytes_written
 
     def truncate(self, length):
         self._w_acquire()
-        self._text = self._text[:length]
+        # Copia invece di una vista, così il buffer originale può essere liberato
+        if length < len(self._text):
+            self._text = memoryview(bytearray(self._text[:length]))
         self._w_release()
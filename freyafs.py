@@ -1,16 +1,16 @@
 import sys
 import os
+import ctypes
 import errno
 import stat
-import shutil
+import threading
 
-from fuse import FuseOSError, Operations
+from itertools import count
+from fuse import FUSE, FuseOSError, Operations, c_stat
+from dirstream import DirStream
 from encfilesmanager import EncFilesManager
 from encfilesinfo import EncFilesInfo
-
-
-def is_encrypted_metadata(path=''):
-    return path.endswith('.private') or path.endswith('.public')
+from trashreaper import TrashReaper, TRASH_DIR, DEFAULT_TRASH_RATE
 
 
 def join_paths(root, partial):
@@ -24,8 +24,26 @@ def strip_dot_enc(path=''):
     return path
 
 
+class FreyaFUSE(FUSE):
+    # fusepy non passa a readdir l'offset richiesto dal kernel:
+    # lo inoltriamo, così rewinddir e seekdir funzionano
+    def readdir(self, path, buf, filler, offset, fip):
+        for name, attrs, entry_offset in self.operations('readdir', self._decode_optional_path(path),
+                                                         fip.contents.fh, offset):
+            st = None
+            if attrs:
+                # libfuse 2 usa solo st_mode (per il d_type)
+                st = c_stat()
+                st.st_mode = attrs['st_mode']
+
+            if filler(buf, name.encode(self.encoding), st, entry_offset) != 0:
+                break
+
+        return 0
+
+
 class FreyaFS(Operations):
-    def __init__(self, root, metadata_root=None):
+    def __init__(self, root, metadata_root=None, trash_rate=DEFAULT_TRASH_RATE):
         self.root = root
         self.metadata_root = metadata_root if metadata_root is not None else root
 
@@ -33,6 +51,16 @@ class FreyaFS(Operations):
         self.enc_files = EncFilesManager()
         self.enc_info = {}
 
+        # Cartelle aperte (opendir)
+        self.open_dirs = {}
+        self._dir_handles = count(1)
+        self._dirs_lock = threading.Lock()
+
+        # Cestino per le eliminazioni differite (frammenti e metadati)
+        self.trash_dir = join_paths(self.root, TRASH_DIR)
+        self.metadata_trash_dir = join_paths(self.metadata_root, TRASH_DIR)
+        self.trash = TrashReaper([self.trash_dir, self.metadata_trash_dir], trash_rate)
+
     # --------------------------------------------------------------------- Helpers
 
     def _full_path(self, path):
@@ -53,6 +81,47 @@ class FreyaFS(Operations):
     def _update_enc_file_size(self, full_path):
         self.enc_info[full_path].size = self.enc_files.cur_size(full_path)
 
+    def _is_trash(self, path):
+        trash = f'/{TRASH_DIR}'
+        return path == trash or path.startswith(f'{trash}/')
+
+    def _check_not_trash(self, path):
+        # Il cestino non è accessibile dal mount, per non interferire con il reaper
+        if self._is_trash(path):
+            raise FuseOSError(errno.EPERM)
+
+    def _plain_attrs(self, st):
+        return dict((key, getattr(st, key)) for key in ('st_atime', 'st_ctime',
+                                                        'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
+
+    def _enc_file_attrs(self, st, size):
+        return {
+            'st_mode': stat.S_IFREG | (st.st_mode & ~stat.S_IFDIR),
+            'st_nlink': 1,
+            'st_atime': st.st_atime,
+            'st_ctime': st.st_ctime,
+            'st_gid': st.st_gid,
+            'st_mtime': st.st_mtime,
+            'st_size': size,
+            'st_uid': st.st_uid
+        }
+
+    def _dirent_attrs(self, path, entry):
+        # fusepy (libfuse 2) usa solo st_mode per il d_type e scarta il resto,
+        # quindi basta il tipo della entry, senza stat e senza leggere metadati
+        if entry.is_symlink():
+            return {'st_mode': stat.S_IFLNK}
+        if entry.is_file(follow_symlinks=False):
+            return {'st_mode': stat.S_IFREG}
+        if not entry.is_dir(follow_symlinks=False):
+            return None
+
+        public_metadata, _, _ = self._metadata_names(os.path.join(path, entry.name))
+        if os.path.exists(public_metadata):
+            return {'st_mode': stat.S_IFREG}
+
+        return {'st_mode': stat.S_IFDIR}
+
     def _is_file(self, path):
         if not os.path.exists(self._full_path(path)):
             return False
@@ -62,6 +131,12 @@ class FreyaFS(Operations):
 
     # --------------------------------------------------------------------- Filesystem methods
 
+    def init(self, path):
+        self.trash.start()
+
+    def destroy(self, path):
+        self.trash.stop()
+
     def access(self, path, mode):
         full_path = self._full_path(path)
         if not os.access(full_path, mode):
@@ -77,45 +152,49 @@ class FreyaFS(Operations):
 
     # Attributi di path (file o cartella)
     def getattr(self, path, fh=None):
+        if self._is_trash(path):
+            raise FuseOSError(errno.ENOENT)
+
         full_path = self._full_path(path)
         public_metadata, _, finfo = self._metadata_names(path)
         
         st = os.lstat(full_path)
 
         if path == '/' or not os.path.exists(public_metadata):
-            return dict((key, getattr(st, key)) for key in ('st_atime', 'st_ctime',
-                                                            'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
+            return self._plain_attrs(st)
 
         try:
             if full_path not in self.enc_info:
                 self.enc_info[full_path] = EncFilesInfo(full_path, public_metadata, finfo)
 
-            return {
-                'st_mode': stat.S_IFREG | (st.st_mode & ~stat.S_IFDIR),
-                'st_nlink': 1,
-                'st_atime': st.st_atime,
-                'st_ctime': st.st_ctime,
-                'st_gid': st.st_gid,
-                'st_mtime': st.st_mtime,
-                'st_size': self.enc_info[full_path].size,
-                'st_uid': st.st_uid
-            }
+            return self._enc_file_attrs(st, self.enc_info[full_path].size)
         except:
-            return dict((key, getattr(st, key)) for key in ('st_atime', 'st_ctime',
-                                                            'st_gid', 'st_mode', 'st_mtime', 'st_nlink', 'st_size', 'st_uid'))
+            return self._plain_attrs(st)
 
-    def readdir(self, path, fh):
-        full_path = self._full_path(path)
-        dirents = ['.', '..']
+    def opendir(self, path):
+        if self._is_trash(path):
+            raise FuseOSError(errno.ENOENT)
+
+        hidden = (TRASH_DIR,) if path == '/' else ()
+        dirstream = DirStream(self._full_path(path), hidden)
+
+        with self._dirs_lock:
+            fh = next(self._dir_handles)
+            self.open_dirs[fh] = dirstream
+
+        return fh
+
+    def readdir(self, path, fh, offset=None):
+        dirstream = self.open_dirs[fh]
+        return dirstream.entries(lambda entry: self._dirent_attrs(path, entry), offset)
 
-        if os.path.isdir(full_path):
-            real_stuff = os.listdir(full_path)
-            virtual_stuff = [
-                x for x in real_stuff if not is_encrypted_metadata(x)]
-            dirents.extend(virtual_stuff)
+    def releasedir(self, path, fh):
+        with self._dirs_lock:
+            dirstream = self.open_dirs.pop(fh, None)
 
-        for r in dirents:
-            yield r
+        if dirstream is not None:
+            dirstream.close()
+        return 0
 
     def readlink(self, path):
         pathname = os.readlink(self._full_path(path))
@@ -126,6 +205,7 @@ class FreyaFS(Operations):
             return pathname
 
     def mknod(self, path, mode, dev):
+        self._check_not_trash(path)
         return os.mknod(self._full_path(path), mode, dev)
 
     def rmdir(self, path):
@@ -133,6 +213,7 @@ class FreyaFS(Operations):
         os.rmdir(self._metadata_full_path(path))
 
     def mkdir(self, path, mode):
+        self._check_not_trash(path)
         os.mkdir(self._full_path(path), mode)
         os.mkdir(self._metadata_full_path(path), mode)
 
@@ -147,21 +228,30 @@ class FreyaFS(Operations):
         full_path = self._full_path(path)
         public_metadata, private_metadata, finfo = self._metadata_names(path)
 
-        os.unlink(public_metadata)
-        os.unlink(private_metadata)
+        if not os.path.exists(public_metadata):
+            os.unlink(full_path)
+            return
+
+        # Prima i metadati e poi i frammenti: se una rename fallisce non resta nulla a metà
+        trashed = [(public_metadata, self.metadata_trash_dir),
+                   (private_metadata, self.metadata_trash_dir)]
         if os.path.isfile(finfo):
-            os.unlink(finfo)
+            trashed.append((finfo, self.metadata_trash_dir))
+        trashed.append((full_path, self.trash_dir))
+
+        self.trash.move(*trashed)
 
         if full_path in self.enc_info:
             del self.enc_info[full_path]
-
-        shutil.rmtree(full_path)
         return
 
     def symlink(self, name, target):
+        self._check_not_trash(target)
         return os.symlink(name, self._full_path(target))
 
     def rename(self, old, new):
+        self._check_not_trash(old)
+        self._check_not_trash(new)
         full_old_path = self._full_path(old)
         full_new_path = self._full_path(new)
 
@@ -195,6 +285,7 @@ class FreyaFS(Operations):
             os.rename(full_old_path, full_new_path)
 
     def link(self, target, name):
+        self._check_not_trash(name)
         return os.link(self._full_path(target), self._full_path(name))
 
     def utimens(self, path, times=None):
@@ -216,6 +307,7 @@ class FreyaFS(Operations):
         return 0
 
     def create(self, path, mode, fi=None):
+        self._check_not_trash(path)
         full_path = self._full_path(path)
         public_metadata, private_metadata, _ = self._metadata_names(path)
         self.enc_files.create(full_path, public_metadata, private_metadata)
@@ -224,7 +316,13 @@ class FreyaFS(Operations):
     def read(self, path, length, offset, fh):
         full_path = self._full_path(path)
         if full_path in self.enc_files:
-            return self.enc_files.read_bytes(full_path, offset, length)
+            data = self.enc_files.read_bytes(full_path, offset, length)
+            if not data:
+                return b''
+
+            # fusepy copia il risultato con ctypes.memmove: un array ctypes
+            # costruito sulla memoryview evita la copia intermedia
+            return (ctypes.c_char * len(data)).from_buffer(data)
 
         os.lseek(fh, offset, os.SEEK_SET)
         return os.read(fh, length)
@@ -253,6 +351,8 @@ class FreyaFS(Operations):
         full_path = self._full_path(path)
         if full_path in self.enc_files:
             self.enc_files.flush(full_path)
+            if full_path in self.enc_info:
+                self.enc_info[full_path].save()
             return 0
 
         return os.fsync(fh)
@@ -1,7 +1,6 @@
 from argparse import ArgumentParser
-from fuse import FUSE, FuseOSError, Operations
-
-from freyafs import FreyaFS
+from freyafs import FreyaFS, FreyaFUSE
+from trashreaper import DEFAULT_TRASH_RATE
 
 parser = ArgumentParser(
     description="Freya File System - a virtual file system that supports Mix&Slice encryption")
@@ -25,6 +24,13 @@ parser.add_argument('-t', '--multithread',
                     action='store_true',
                     default=False
                     )
+parser.add_argument('-r', '--trash-rate',
+                    help=f'''How many files (fragments and metadata files) are removed from the trash
+                    per second in background. An encrypted file has about 1027 files.
+                    0 means no limit (default {DEFAULT_TRASH_RATE}).''',
+                    type=int,
+                    default=DEFAULT_TRASH_RATE
+                    )
 
 args = parser.parse_args()
 
@@ -33,5 +39,5 @@ if __name__ == '__main__':
     metadata = args.metadata
     mountpoint = args.mountpoint
 
-    FUSE(FreyaFS(data, metadata), mountpoint,
-         nothreads=not args.multithread, foreground=True)
+    FreyaFUSE(FreyaFS(data, metadata, args.trash_rate), mountpoint,
+              nothreads=not args.multithread, foreground=True)
@@ -0,0 +1,68 @@
+import os
+
+from Crypto.Cipher import AES
+from Crypto.Util import Counter
+from aesmix import Padder
+
+# aesmix non espone un modo per decifrare senza copie: MixSlice.decrypt legge
+# ogni frammento in bytes e restituisce bytes. Per questo usiamo alcuni nomi
+# privati di aesmix 1.6 (versione fissata in requirements.txt), tutti raccolti qui
+from aesmix.manager import _MixSliceMetadata
+from aesmix.wrapper import _lib, _mixprocess
+
+MINI_PER_MACRO = _lib.MINI_PER_MACRO
+MACRO_SIZE = _lib.MACRO_SIZE
+
+
+def _load_metadata(public_metadata):
+    metadata = _MixSliceMetadata.load_from_file(public_metadata)
+    return metadata, metadata._key, metadata._iv
+
+
+def _unslice_and_unmix(data, key, iv, threads=None):
+    # Come aesmix.unslice_and_unmix, ma su un unico buffer già contiguo
+    # e senza copiare il risultato in bytes
+    return _mixprocess(data, key, iv, _lib.unsliceunmix, False, threads)
+
+
+def _load_fragments(fragsdir):
+    # Legge tutti i frammenti, in ordine, dentro un unico buffer contiguo
+    fragfiles = [os.path.join(fragsdir, f) for f in sorted(os.listdir(fragsdir))]
+    assert len(fragfiles) == MINI_PER_MACRO, \
+        "exactly MINI_PER_MACRO files required in fragsdir."
+
+    sizes = [os.path.getsize(f) for f in fragfiles]
+    data = bytearray(sum(sizes))
+    view = memoryview(data)
+
+    fragments = []
+    offset = 0
+    for fragfile, size in zip(fragfiles, sizes):
+        fragment = view[offset:offset + size]
+        with open(fragfile, 'rb', buffering=0) as f:
+            read = 0
+            while read < size:
+                n = f.readinto(fragment[read:])
+                if not n:
+                    raise EOFError(f'{fragfile} is shorter than expected')
+                read += n
+
+        fragments.append(fragment)
+        offset += size
+
+    return data, fragments
+
+
+def decrypt(fragsdir, public_metadata, threads=None):
+    # Decifra senza copie intermedie: i frammenti vengono decifrati in place
+    # e il risultato è una memoryview (scrivibile) sul testo in chiaro
+    metadata, key, iv = _load_metadata(public_metadata)
+    data, fragments = _load_fragments(fragsdir)
+
+    for fragment_id, step_key in metadata.decryption_steps():
+        ctr = Counter.new(128)
+        cipher = AES.new(step_key[:16], mode=AES.MODE_CTR, counter=ctr)
+        cipher.decrypt(fragments[fragment_id], output=fragments[fragment_id])
+
+    padded = memoryview(_unslice_and_unmix(data, key, iv, threads))
+    return Padder(blocksize=MACRO_SIZE).unpad(padded)
@@ -0,0 +1,116 @@
+import os
+import shutil
+import threading
+import uuid
+
+from collections import deque
+
+TRASH_DIR = '.freyafs-trash'
+
+# File eliminati al secondo dal cestino. Un file cifrato ne conta circa 1027
+# (1024 frammenti più .public, .private e .finfo): circa 10 file cifrati al secondo
+DEFAULT_TRASH_RATE = 10000
+
+# Tentativi per ogni elemento del cestino, poi resta lì fino al prossimo mount
+MAX_ATTEMPTS = 3
+
+
+class TrashReaper:
+    def __init__(self, trash_dirs, files_per_sec=DEFAULT_TRASH_RATE):
+        # files_per_sec <= 0 disattiva il limite
+        self.trash_dirs = set(trash_dirs)
+        self._interval = 1 / files_per_sec if files_per_sec > 0 else 0
+
+        self._queue = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Quello che è rimasto nel cestino (es. dopo un crash) viene eliminato al mount
+        for trash_dir in self.trash_dirs:
+            os.makedirs(trash_dir, exist_ok=True)
+            for name in os.listdir(trash_dir):
+                self._queue.append((os.path.join(trash_dir, name), 1))
+
+    # ------------------------------------------------------ Helpers
+
+    def _remove(self, path):
+        # Restituisce quanti file sono stati eliminati, per il limite di velocità
+        if not os.path.isdir(path) or os.path.islink(path):
+            os.unlink(path)
+            return 1
+
+        files = sum(len(filenames) for _, _, filenames in os.walk(path))
+        shutil.rmtree(path)
+        return files
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stop.is_set():
+                    self._cond.wait()
+
+                if self._stop.is_set():
+                    return
+
+                path, attempt = self._queue.popleft()
+
+            try:
+                files = self._remove(path)
+            except OSError:
+                # Si riprova più tardi; dopo MAX_ATTEMPTS l'elemento resta nel cestino
+                # e viene ripreso dalla pulizia al prossimo mount
+                if attempt < MAX_ATTEMPTS:
+                    with self._cond:
+                        self._queue.append((path, attempt + 1))
+                files = 1
+
+            # Il limite conta i file eliminati, così una cartella di frammenti
+            # pesa quanto i suoi 1024 file e non quanto un .finfo
+            if self._interval:
+                self._stop.wait(files * self._interval)
+
+    # ------------------------------------------------------ Methods
+
+    def move(self, *items):
+        # Sposta ogni (path, trash_dir) nel cestino con una rename atomica,
+        # l'eliminazione avviene dopo. Se una rename fallisce, quelle già fatte
+        # vengono annullate e l'errore viene rilanciato
+        moved = []
+        try:
+            for path, trash_dir in items:
+                trashed = os.path.join(trash_dir, uuid.uuid4().hex)
+                os.rename(path, trashed)
+                moved.append((path, trashed))
+        except OSError:
+            # Ogni rollback è indipendente: se uno fallisce si provano comunque gli altri
+            # e si rilancia l'errore originale
+            for path, trashed in reversed(moved):
+                try:
+                    os.rename(trashed, path)
+                except OSError:
+                    pass
+            raise
+
+        with self._cond:
+            self._queue.extend((trashed, 1) for _, trashed in moved)
+            self._cond.notify()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+
+        with self._cond:
+            self._stop.set()
+            self._cond.notify_all()
+
+        self._thread.join()
+        self._thread = None